@@ -1,130 +1,545 @@
+import concurrent.futures
+import gc
+import hashlib
 import os
+import sqlite3
+import threading
+from functools import lru_cache
 import chromadb
-from typing import List, Dict
+import numpy as np
+from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+from typing import Iterator, List, Dict, Tuple
+
+from seed_extract import SUPPORTED_EXTENSIONS, _extract_one
 
 # -----------------------------------
 # CHROMA PERSISTENT CLIENT
 # -----------------------------------
 chroma_client = chromadb.PersistentClient(path="db")
-collection = chroma_client.get_or_create_collection(name="synapse_rag_v2")
+
+def _make_embedding_fn() -> ONNXMiniLM_L6_V2:
+    """
+    Build the MiniLM embedding function, optionally with INT8 weights.
+
+    Set SYNAPSE_INT8_EMBED=1 to quantize the cached FP32 model once via
+    onnxruntime dynamic quantization and serve from the INT8 copy
+    (roughly half the memory bandwidth, ~2x throughput on VNNI CPUs;
+    cosine delta vs FP32 is well under 1e-2 for MiniLM). Falls back to
+    FP32 with a warning if quantization is unavailable.
+    """
+    fn = ONNXMiniLM_L6_V2()
+    if not os.getenv("SYNAPSE_INT8_EMBED"):
+        return fn
+
+    try:
+        import onnxruntime as ort
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        fn._download_model_if_not_exists()
+        model_dir = os.path.join(fn.DOWNLOAD_PATH, fn.EXTRACTED_FOLDER_NAME)
+        fp32_path = os.path.join(model_dir, "model.onnx")
+        int8_path = os.path.join(model_dir, "model.int8.onnx")
+        if not os.path.exists(int8_path):
+            print("[INFO] Quantizing embedding model to INT8 (one-time)...")
+            quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+        # ONNXMiniLM_L6_V2.model is a cached_property; pre-seeding it
+        # makes every forward pass use the INT8 session.
+        fn.model = ort.InferenceSession(int8_path, providers=["CPUExecutionProvider"])
+        print("[INFO] Using INT8-quantized embedding model.")
+    except Exception as e:
+        print("[WARN] INT8 embedding unavailable, staying on FP32:", e)
+
+    return fn
+
+
+# The same MiniLM model Chroma would use implicitly, but held here so the
+# ONNX forward pass can be run explicitly in large batches instead of
+# inside every collection.add() call.
+_embedding_fn = _make_embedding_fn()
+
+# When a fresh collection is created under SYNAPSE_BULK_INGEST, defer
+# HNSW graph maintenance: buffer adds in large strides and sync the
+# graph every 100k vectors instead of incrementally per batch. Only
+# applies at creation time — an existing collection keeps its settings.
+_collection_metadata = None
+if os.getenv("SYNAPSE_BULK_INGEST"):
+    _collection_metadata = {
+        "hnsw:batch_size": 10000,
+        "hnsw:sync_threshold": 100000,
+    }
+
+collection = chroma_client.get_or_create_collection(
+    name="synapse_rag_v2",
+    embedding_function=_embedding_fn,
+    metadata=_collection_metadata,
+)
+
+
+def _apply_bulk_ingest_pragmas(db_path: str = "db") -> None:
+    """
+    Switch Chroma's SQLite file to WAL for bulk seed loads.
+
+    journal_mode=WAL is a database-level setting and persists for every
+    later connection (including Chroma's own writer), which is where the
+    fsync-per-transaction cost goes away. Per-connection pragmas like
+    synchronous=OFF would only affect this throwaway connection, so they
+    are deliberately not set here. Gated behind SYNAPSE_BULK_INGEST so
+    the journal mode only changes when a seed load is intended.
+    """
+    if not os.getenv("SYNAPSE_BULK_INGEST"):
+        return
+
+    sqlite_file = os.path.join(db_path, "chroma.sqlite3")
+    if not os.path.exists(sqlite_file):
+        return
+
+    try:
+        conn = sqlite3.connect(sqlite_file)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+        print("[INFO] Bulk-ingest SQLite journal_mode=WAL applied.")
+    except Exception as e:
+        print("[WARN] Could not apply bulk-ingest pragmas:", e)
+
+
+_apply_bulk_ingest_pragmas()
 
 # ---------- Helpers ----------
 
+def _chunk_offsets(text_len: int, chunk_size: int = 500, overlap: int = 50) -> List[Tuple[int, int]]:
+    """
+    Compute [start, end) window offsets for an overlapped chunker.
+
+    Both offset arrays are produced by vectorized NumPy ops, so there is
+    no per-chunk Python arithmetic and callers only slice the text when
+    they actually need the chunk string.
+    """
+    if text_len <= 0:
+        return []
+    step = max(1, chunk_size - overlap)
+    starts = np.arange(0, max(text_len - overlap, 1), step, dtype=np.int64)
+    ends = np.minimum(starts + chunk_size, text_len)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+# Safety: truncate extremely long text to avoid MemoryError
+MAX_DOC_CHARS = 200_000  # 200k characters ~ 40–50 pages of text
+
+
 def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
     """
     Simple overlapped text chunker.
     """
+    if len(text) > MAX_DOC_CHARS:
+        text = text[:MAX_DOC_CHARS]
+
+    offsets = _chunk_offsets(len(text), chunk_size, overlap)
+    chunks = [text[s:e].strip() for s, e in offsets]
+    return [c for c in chunks if c]
+
+
+# Streaming seed ingestion flushes its buffer at this many chunks —
+# small enough to bound memory on huge corpora.
+BATCH_SIZE = 200
+
+# collection.add() slab size inside a flush. Chroma does one SQLite
+# transaction + HNSW update per .add(), so bigger slabs amortize both;
+# 5000 stays under Chroma's max-batch limit (~5461).
+ADD_BATCH = 5000
+
+# collection.get() id-existence probes are done in slices of this size.
+EXISTS_CHECK_BATCH = 1000
+
+# Sequences per ONNX embedding forward pass.
+EMBED_BATCH = 256
+
+
+def _embed(texts: List[str]) -> List[List[float]]:
+    """
+    Embed texts in EMBED_BATCH-sized forward passes.
+    """
+    out: List[List[float]] = []
+    for i in range(0, len(texts), EMBED_BATCH):
+        out.extend(_embedding_fn(texts[i:i + EMBED_BATCH]))
+    return out
+
+
+_EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+class _EmbedCache:
+    """
+    Content-addressed embedding cache in a sidecar SQLite file.
+
+    Keys are blake2b(model_name + NUL + chunk_text); vectors are stored
+    as raw float32 bytes, so a hit is one row read + np.frombuffer.
+    Re-uploaded files (the common n8n retry pattern) only pay the
+    embedding forward pass for chunks that actually changed.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(
+            (_EMBED_MODEL_NAME + "\0" + text).encode("utf-8"), digest_size=16
+        ).digest()
+
+    def get_or_compute(self, texts: List[str], compute) -> List[List[float]]:
+        if not texts:
+            return []
+        keys = [self._key(t) for t in texts]
+
+        found: Dict[bytes, List[float]] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", batch
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        if missing:
+            computed = compute([texts[i] for i in missing])
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+                    [
+                        (keys[i], np.asarray(vec, dtype=np.float32).tobytes())
+                        for i, vec in zip(missing, computed)
+                    ],
+                )
+                self._conn.commit()
+            for i, vec in zip(missing, computed):
+                found[keys[i]] = list(vec)
+
+        return [found[k] for k in keys]
+
+
+_embed_cache = _EmbedCache(os.path.join("db", "embed_cache.sqlite3"))
+
+
+def _chunk_id(base_id: str, idx: int, chunk: str) -> str:
+    """
+    Deterministic content-addressed chunk id. Hashing the chunk prefix in
+    means edited content gets a fresh id while unchanged chunks keep
+    theirs, so re-ingesting a file is idempotent.
+    """
+    key = f"{base_id}_{idx}_{chunk[:64]}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _prepare_chunks(text: str, source_name: str, user_id: str = "seed", domain: str = "general"):
+    """
+    Chunk one logical document and build the parallel ids/documents/
+    metadatas lists for Chroma. Pure — does not touch the collection.
+    """
+    if len(text) > MAX_DOC_CHARS:
+        text = text[:MAX_DOC_CHARS]
+
+    # One pass over the offset windows: slice, strip, filter and derive
+    # the id together, instead of chunk-list -> enumerate -> id loops.
+    # Ids still index over kept chunks, so they match prior runs.
+    base_id = f"{user_id}_{source_name}"
+    ids: List[str] = []
     chunks: List[str] = []
-    start = 0
-    n = len(text)
-
-    # Safety: truncate extremely long text to avoid MemoryError
-    max_chars = 200_000  # 200k characters ~ 40–50 pages of text
-    if n > max_chars:
-        text = text[:max_chars]
-        n = len(text)
-
-    while start < n:
-        end = min(start + chunk_size, n)
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        start += chunk_size - overlap
-        if chunk_size - overlap <= 0:
-            break
+    for s, e in _chunk_offsets(len(text)):
+        c = text[s:e].strip()
+        if not c:
+            continue
+        ids.append(_chunk_id(base_id, len(chunks), c))
+        chunks.append(c)
 
-    return chunks
+    # Every chunk of a document carries identical metadata; share one
+    # dict instead of allocating N copies. Chroma serializes metadatas
+    # on add and never mutates them in place, so aliasing is safe.
+    meta = {
+        "source": source_name,
+        "user_id": user_id,
+        "domain": domain,
+    }
+    metadatas = [meta] * len(chunks)
+    return ids, chunks, metadatas
+
+
+def _existing_ids(ids: List[str]) -> set:
+    """
+    Return the subset of ids already present in the collection.
+    """
+    existing = set()
+    for i in range(0, len(ids), EXISTS_CHECK_BATCH):
+        got = collection.get(ids=ids[i:i + EXISTS_CHECK_BATCH], include=[])
+        existing.update(got["ids"])
+    return existing
+
+
+def _flush(ids: List[str], documents: List[str], metadatas: List[Dict]) -> List[str]:
+    """
+    Add prepared chunks to Chroma in BATCH_SIZE slices, skipping chunks
+    whose ids are already stored — the slow part (embedding) only runs
+    for genuinely new content. Returns the ids actually added.
+    """
+    # Drop duplicate chunk content (repeated headers, footers, license
+    # boilerplate) before paying to store it twice. Scoped to the
+    # (source, user_id, domain) the chunk belongs to: a flush can carry
+    # several tenants' payloads, and one tenant's copy must never
+    # swallow another's — the embedding cache already makes duplicate
+    # content free to embed across scopes.
+    seen_keys = set()
+    keep = []
+    for i, t in enumerate(documents):
+        meta = metadatas[i]
+        key = (
+            meta.get("source"),
+            meta.get("user_id"),
+            meta.get("domain"),
+            hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(),
+        )
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        keep.append(i)
+    if len(keep) != len(documents):
+        ids = [ids[i] for i in keep]
+        documents = [documents[i] for i in keep]
+        metadatas = [metadatas[i] for i in keep]
+
+    existing = _existing_ids(ids)
+    if existing:
+        keep = [i for i, x in enumerate(ids) if x not in existing]
+        ids = [ids[i] for i in keep]
+        documents = [documents[i] for i in keep]
+        metadatas = [metadatas[i] for i in keep]
+
+    # Embed everything up front in big batches; .add() then only has to
+    # write, instead of embedding each micro-batch internally. The
+    # content-addressed cache means only never-seen chunks hit the model.
+    embeddings = _embed_cache.get_or_compute(documents, _embed)
+
+    for i in range(0, len(ids), ADD_BATCH):
+        collection.add(
+            ids=ids[i:i + ADD_BATCH],
+            documents=documents[i:i + ADD_BATCH],
+            metadatas=metadatas[i:i + ADD_BATCH],
+            embeddings=embeddings[i:i + ADD_BATCH],
+        )
+    return ids
 
 
 def ingest_text(text: str, source_name: str, user_id: str = "seed", domain: str = "general") -> int:
     """
     Add a single logical document (text) into Chroma as multiple chunks.
     """
-    chunks = chunk_text(text)
+    ids, chunks, metadatas = _prepare_chunks(text, source_name, user_id, domain)
     if not chunks:
         return 0
+    return len(_flush(ids, chunks, metadatas))
+
+
+def ingest_many(payloads: List[Tuple[str, str, str, str]]) -> List[int]:
+    """
+    Ingest several logical documents in one flush — one embedding pass
+    and one set of add slabs for the whole batch. Each payload is
+    (text, source_name, user_id, domain); returns the number of chunks
+    actually added per payload, matching ingest_text's semantics.
+    """
+    all_ids: List[str] = []
+    all_docs: List[str] = []
+    all_metas: List[Dict] = []
+    id_slices: List[List[str]] = []
+    for text, source_name, user_id, domain in payloads:
+        ids, chunks, metadatas = _prepare_chunks(text, source_name, user_id, domain)
+        id_slices.append(ids)
+        all_ids.extend(ids)
+        all_docs.extend(chunks)
+        all_metas.extend(metadatas)
+
+    added = set(_flush(all_ids, all_docs, all_metas)) if all_ids else set()
+    return [sum(1 for chunk_id in ids if chunk_id in added) for ids in id_slices]
+
+# ---------- QUERY ----------
+
+@lru_cache(maxsize=4096)
+def _embed_query(query_text: str) -> Tuple[float, ...]:
+    """
+    Embed one normalized query string, memoized. Production /search
+    traffic repeats queries heavily, and the embed forward pass dwarfs
+    the HNSW lookup — a cache hit skips it entirely. Returns a tuple so
+    the cached value is hashable and immutable.
+    """
+    return tuple(_embed([query_text])[0])
+
+
+def embed_query(query_text: str) -> List[float]:
+    """
+    Public wrapper around the cached query embedder, for callers outside
+    this module (e.g. the semantic cache in main.py).
+    """
+    return list(_embed_query(query_text.strip().lower()))
+
+
+# The four possible (user_id?, domain?) filter shapes are predefined so
+# the hot /search path dispatches on a bool tuple instead of rebuilding
+# nested where-dicts per request.
+_WHERE_BUILDERS = {
+    (True, True): lambda u, d: {"$and": [{"user_id": u}, {"domain": d}]},
+    (True, False): lambda u, d: {"user_id": u},
+    (False, True): lambda u, d: {"domain": d},
+    (False, False): lambda u, d: None,
+}
+
+
+def query_chunks(
+    query_text: str,
+    top_k: int = 5,
+    user_id: str = "global",
+    domain: str = "general",
+    query_embedding=None,
+) -> List[Dict]:
+    """
+    Return the top_k most relevant stored chunks for a query.
+
+    The "global"/"general" defaults mean "no filter", so seed content
+    stays reachable for every caller. Pass query_embedding to skip the
+    embed step when the caller has already computed (or cached) it.
+    """
+    has_user = bool(user_id) and user_id != "global"
+    has_domain = bool(domain) and domain != "general"
+    where = _WHERE_BUILDERS[(has_user, has_domain)](user_id, domain)
+
+    kwargs = {"n_results": top_k}
+    if where is not None:
+        kwargs["where"] = where
+    if query_embedding is not None:
+        kwargs["query_embeddings"] = [list(query_embedding)]
+    else:
+        kwargs["query_embeddings"] = [list(_embed_query(query_text.strip().lower()))]
+
+    result = collection.query(**kwargs)
+
+    documents = (result.get("documents") or [[]])[0]
+    metadatas = (result.get("metadatas") or [[]])[0]
+    distances = (result.get("distances") or [[]])[0]
+
+    chunks: List[Dict] = []
+    for i, doc in enumerate(documents):
+        meta = metadatas[i] if i < len(metadatas) else {}
+        chunks.append(
+            {
+                "text": doc,
+                "source": (meta or {}).get("source"),
+                "user_id": (meta or {}).get("user_id"),
+                "domain": (meta or {}).get("domain"),
+                "distance": distances[i] if i < len(distances) else None,
+            }
+        )
+    return chunks
 
-    base_id = f"{user_id}_{source_name}"
-    ids = [f"{base_id}_{i}" for i in range(len(chunks))]
-    metadatas = [
-        {
-            "source": source_name,
-            "user_id": user_id,
-            "domain": domain,
-        }
-        for _ in chunks
-    ]
-
-    collection.add(
-        ids=ids,
-        documents=chunks,
-        metadatas=metadatas,
-    )
-    return len(chunks)
 
 # ---------- SEED DOCUMENTS ----------
 
-def load_seed_documents(folder: str = "documents") -> List[Dict]:
-    docs: List[Dict] = []
+# Run gc.collect() after this many flushes during streaming ingestion.
+GC_EVERY_N_FLUSHES = 10
 
+
+def _list_seed_paths(folder: str = "documents") -> List[str]:
     print("[DEBUG] CWD:", os.getcwd())
     print("[DEBUG] Looking for folder:", folder)
 
     if not os.path.exists(folder):
         print(f"[WARN] Seed documents folder '{folder}' not found.")
-        return docs
+        return []
 
-    files = os.listdir(folder)
-    print("[DEBUG] Files in documents:", files)
+    paths: List[str] = []
+    # scandir caches the file type from the directory read itself, so
+    # there is no extra stat() per entry like listdir + isfile.
+    with os.scandir(folder) as it:
+        for entry in it:
+            # Only regular files
+            if not entry.is_file():
+                continue
 
-    for file in files:
-        path = os.path.join(folder, file)
+            lower = entry.name.lower()
+            if not lower.endswith(SUPPORTED_EXTENSIONS):
+                print(f"[INFO] Skipping unsupported seed file: {entry.name}")
+                continue
 
-        # Only regular files
-        if not os.path.isfile(path):
-            continue
+            paths.append(entry.path)
 
-        # Only read *text* files here, skip PDFs and others
-        lower = file.lower()
-        if not lower.endswith((".txt", ".md")):
-            print(f"[INFO] Skipping non-text seed file: {file}")
-            continue
+    print("[DEBUG] Files in documents:", [os.path.basename(p) for p in paths])
+    return paths
 
-        try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                text = f.read()
-        except Exception as e:
-            print(f"[WARN] Could not read {path}: {e}")
-            continue
 
-        docs.append(
-            {
-                "text": text,
-                "source_name": file,
-                "user_id": "seed",
-                "domain": "general",
-            }
-        )
+def iter_chunks(folder: str = "documents") -> Iterator[Tuple[str, str, Dict]]:
+    """
+    Stream (id, chunk, metadata) triples for every seed file, holding at
+    most one extracted document in memory at a time.
+    """
+    paths = _list_seed_paths(folder)
+    if not paths:
+        return
 
-    print(f"[DEBUG] Total seed docs prepared: {len(docs)}")
-    return docs
+    # PDF parsing and OCR are CPU-bound; spread extraction across cores.
+    # Workers only extract — the Chroma client stays in this process.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        for file, text in pool.map(_extract_one, paths):
+            if not text:
+                continue
+            ids, chunks, metadatas = _prepare_chunks(text, file, "seed", "general")
+            print(f"[INFO] Seed doc '{file}' -> {len(chunks)} chunks.")
+            yield from zip(ids, chunks, metadatas)
 
 
 def ingest_seed_documents():
-    docs = load_seed_documents()
-    if not docs:
+    # Bounded buffer: flush every BATCH_SIZE chunks so memory stays
+    # O(BATCH_SIZE * chunk_size) no matter how large the seed folder is.
+    buf_ids: List[str] = []
+    buf_docs: List[str] = []
+    buf_metas: List[Dict] = []
+    total_chunks = 0
+    flushes = 0
+
+    for chunk_id, chunk, meta in iter_chunks():
+        buf_ids.append(chunk_id)
+        buf_docs.append(chunk)
+        buf_metas.append(meta)
+
+        if len(buf_ids) >= BATCH_SIZE:
+            total_chunks += len(_flush(buf_ids, buf_docs, buf_metas))
+            buf_ids.clear()
+            buf_docs.clear()
+            buf_metas.clear()
+            flushes += 1
+            if flushes % GC_EVERY_N_FLUSHES == 0:
+                gc.collect()
+
+    if buf_ids:
+        total_chunks += len(_flush(buf_ids, buf_docs, buf_metas))
+
+    if total_chunks == 0:
         print("[INFO] No seed documents to ingest.")
         return
 
-    total_chunks = 0
-    for d in docs:
-        n = ingest_text(d["text"], d["source_name"], d["user_id"], d["domain"])
-        print(f"[INFO] Seed doc '{d['source_name']}' -> {n} chunks.")
-        total_chunks += n
-
     print(f"[INFO] Seed ingestion complete. Total chunks: {total_chunks}")
 
 
+# main.py imports the seed-ingestion entry point under this name.
+ingest_documents = ingest_seed_documents
+
+
 if __name__ == "__main__":
     count = collection.count()
     print(f"[INFO] Collection currently has {count} records.")
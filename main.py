@@ -1,22 +1,40 @@
 # main.py
 
+import asyncio
 import base64
 import binascii
+import concurrent.futures
+import fcntl
+import hashlib
+import os
+import threading
+import time
 import traceback
+from collections import OrderedDict
 from io import BytesIO
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import numpy as np
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, field_validator
+from starlette.concurrency import run_in_threadpool
 
 from chroma_setup import (
     query_chunks,
+    embed_query,
     ingest_documents,
+    ingest_many,
     ingest_text,
     collection,
 )
 
 # Optional text-extraction libs
+try:
+    import fitz  # PyMuPDF
+except Exception:
+    fitz = None
+
 try:
     from PyPDF2 import PdfReader
 except Exception:
@@ -24,14 +42,29 @@ except Exception:
 
 try:
     import docx  # python-docx
+    from docx.oxml.ns import qn as _docx_qn
 except Exception:
     docx = None
+    _docx_qn = None
 
 try:
     import textract  # very broad, but heavier
 except Exception:
     textract = None
 
+try:
+    import httpx
+except Exception:
+    httpx = None
+
+# orjson serializes the large text-heavy /search bodies several times
+# faster than the default pure-Python json encoder
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as _DefaultResponseClass
+except Exception:
+    from fastapi.responses import JSONResponse as _DefaultResponseClass
+
 
 # ---------------------------------------------------------
 # FASTAPI APP
@@ -40,77 +73,212 @@ app = FastAPI(
     title="Synapse RAG Backend",
     description="RAG endpoint powering n8n Agentic Workflow with file ingestion",
     version="1.1.0",
+    default_response_class=_DefaultResponseClass,
 )
 
+# /search bodies are lists of natural-language chunks — highly
+# compressible; gzip only kicks in above 1KB so small responses skip it.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 
 # ---------------------------------------------------------
 # BOOTSTRAP: ENSURE COLLECTION HAS DATA
 # ---------------------------------------------------------
-try:
-    count = collection.count()
-    print(f"[BOOT] Chroma collection has {count} records.")
-    if count == 0:
-        print("[BOOT] No records found. Ingesting seed /documents...")
-        ingest_documents()
-    else:
-        print("[BOOT] Existing data found. Skipping seed ingestion.")
-except Exception as e:
-    print("[BOOT ERROR] Could not check or ingest Chroma collection:", e)
-    traceback.print_exc()
+def _bootstrap_seed_data():
+    """
+    Check the collection once and seed it if empty. Guarded by an
+    exclusive file lock so that with multiple workers (gunicorn -w N)
+    exactly one process runs the count + ingest; the rest skip instead
+    of racing N concurrent seed ingests on a cold start.
+    """
+    try:
+        os.makedirs("db", exist_ok=True)
+        with open(os.path.join("db", ".bootstrap.lock"), "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                print("[BOOT] Another worker is bootstrapping; skipping seed check.")
+                return
+
+            count = collection.count()
+            print(f"[BOOT] Chroma collection has {count} records.")
+            if count == 0:
+                print("[BOOT] No records found. Ingesting seed /documents...")
+                ingest_documents()
+            else:
+                print("[BOOT] Existing data found. Skipping seed ingestion.")
+            # flock is released when the file closes
+    except Exception as e:
+        print("[BOOT ERROR] Could not check or ingest Chroma collection:", e)
+        traceback.print_exc()
+
+
+_bootstrap_seed_data()
+
+
+# ---------------------------------------------------------
+# SEMANTIC QUERY CACHE
+# ---------------------------------------------------------
+class QueryCache:
+    """
+    LRU + TTL cache for /search results, keyed semantically: a lookup
+    hits when a cached query in the same (user_id, domain, top_k)
+    namespace has cosine similarity >= threshold with the new query
+    embedding. Conversational traffic repeats itself heavily, so a hit
+    skips both the embedding lookup in Chroma and the ANN query.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 300.0, threshold: float = 0.97):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        # key -> (expiry, normalized query vector, chunks)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    def _evict_expired(self, now: float) -> None:
+        # Fixed TTL means insertion order ~= expiry order.
+        while self._entries:
+            key = next(iter(self._entries))
+            if self._entries[key][0] >= now:
+                break
+            self._entries.popitem(last=False)
+
+    async def get(self, namespace: tuple, qvec: np.ndarray):
+        async with self._lock:
+            now = time.monotonic()
+            self._evict_expired(now)
+            keys = [k for k in self._entries if k[0] == namespace]
+            if not keys:
+                return None
+            sims = np.stack([self._entries[k][1] for k in keys]) @ qvec
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+            key = keys[best]
+            # Refreshing recency on hits breaks the insertion-order ~=
+            # expiry assumption _evict_expired relies on, so the matched
+            # entry must be TTL-checked itself — without this a hot
+            # query's stale results would be served past expiry
+            # indefinitely.
+            if self._entries[key][0] < now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][2]
+
+    async def put(self, namespace: tuple, qvec: np.ndarray, chunks) -> None:
+        async with self._lock:
+            key = (namespace, tuple(np.round(qvec, 3).tolist()))
+            self._entries[key] = (time.monotonic() + self.ttl, qvec, chunks)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_query_cache = QueryCache()
+
+
+def _normalized_query_vec(query: str) -> np.ndarray:
+    qvec = np.asarray(embed_query(query), dtype=np.float32)
+    return qvec / max(float(np.linalg.norm(qvec)), 1e-12)
 
 
 # ---------------------------------------------------------
 # Pydantic Models
 # ---------------------------------------------------------
-class SearchQuery(BaseModel):
+class ScopedPayload(BaseModel):
+    """
+    Shared user_id/domain fields. Falsy values (None, "") collapse to
+    the defaults at parse time, so call sites never need `or "global"`
+    and None can't leak into Chroma metadata and break where-filters.
+    """
+
+    user_id: str = "global"
+    domain: str = "general"
+
+    @field_validator("user_id", "domain", mode="before")
+    @classmethod
+    def _falsy_to_default(cls, value, info):
+        if not value:
+            return cls.model_fields[info.field_name].default
+        return value
+
+
+class SearchQuery(ScopedPayload):
     query: str
     subject: Optional[str] = ""
-    user_id: Optional[str] = "global"
-    domain: Optional[str] = "general"
+    use_web: Optional[bool] = False
 
 
-class IngestTextPayload(BaseModel):
+class IngestTextPayload(ScopedPayload):
     text: str
     source_name: str = "student_upload"
-    user_id: Optional[str] = "global"
-    domain: Optional[str] = "general"
 
 
-class IngestFilePayload(BaseModel):
+class IngestFilePayload(ScopedPayload):
     base64_data: str
     filename: str = "upload"
     mime_type: Optional[str] = None
-    user_id: Optional[str] = "global"
-    domain: Optional[str] = "general"
 
 
 # ---------------------------------------------------------
 # TEXT EXTRACTION HELPERS
 # ---------------------------------------------------------
+def _pypdf2_page_text(page) -> str:
+    # PyPDF2 can raise on malformed pages; fitz needs no such guard
+    try:
+        return page.extract_text() or ""
+    except Exception:
+        return ""
+
+
 def _extract_pdf(data: bytes) -> str:
+    # Prefer MuPDF: its C text extractor is typically 5-20x faster than
+    # PyPDF2's pure-Python page loops.
+    if fitz:
+        doc = fitz.open(stream=data, filetype="pdf")
+        try:
+            return "\n\n".join(page.get_text("text") for page in doc).strip()
+        finally:
+            doc.close()
+
     if not PdfReader:
-        raise RuntimeError("PyPDF2 is not installed in this environment.")
+        raise RuntimeError("Neither PyMuPDF nor PyPDF2 is installed in this environment.")
 
+    # Generator straight into join — no per-page list growth, and only
+    # one page's transient extraction tables are alive at a time.
     reader = PdfReader(BytesIO(data))
-    pages_text = []
-    for page in reader.pages:
-        try:
-            pages_text.append(page.extract_text() or "")
-        except Exception:
-            continue
-    return "\n\n".join(pages_text).strip()
+    return "\n\n".join(_pypdf2_page_text(page) for page in reader.pages).strip()
 
 
 def _extract_docx(data: bytes) -> str:
     if not docx:
         raise RuntimeError("python-docx is not installed in this environment.")
     document = docx.Document(BytesIO(data))
-    return "\n".join(p.text for p in document.paragraphs).strip()
+    # Iterate the raw <w:t> text nodes — .paragraphs would build a
+    # Paragraph wrapper object for every <w:p> just to read .text.
+    body = document.element.body
+    return "\n".join(t.text for t in body.iter(_docx_qn("w:t")) if t.text).strip()
+
+
+def _decode_txt(data: bytes) -> str:
+    return data.decode("utf-8", errors="ignore").strip()
+
+
+# Extensions where textract's specialized parsers beat a plain decode.
+# Resolved once at import so the fallback path never pays textract's
+# per-call plugin discovery for files it would decode as text anyway.
+_TEXTRACT_EXTS = frozenset(
+    {"doc", "rtf", "odt", "epub", "pptx", "xlsx", "csv", "html", "htm", "eml", "msg"}
+)
 
 
 def _extract_generic(data: bytes, filename: str) -> str:
-    # Last-resort extraction: try textract if available, otherwise treat as UTF-8 text
-    if textract:
+    # Last-resort extraction: textract only for formats it actually
+    # parses better than UTF-8 decoding
+    ext = filename.lower().rpartition(".")[2]
+    if textract and ext in _TEXTRACT_EXTS:
         try:
             txt = textract.process(filename, input_data=data)
             return txt.decode("utf-8", errors="ignore").strip()
@@ -119,33 +287,171 @@ def _extract_generic(data: bytes, filename: str) -> str:
 
     # Fallback: assume text
     try:
-        return data.decode("utf-8", errors="ignore").strip()
+        return _decode_txt(data)
     except Exception:
         return ""
 
 
+# Largest accepted upload after decoding. The base64 check below works
+# on the encoded length (4/3 of the raw size) so an oversized payload
+# is rejected with one integer compare, before any decode allocation.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+
+
+# PDF/DOCX parsing is CPU-bound (and partly pure Python), so threads
+# serialize on the GIL; a process pool lets concurrent ingests use every
+# core. The extractors are module-level and picklable.
+_extractor_pool = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count())
+
+
+async def _extract_in_pool(data: bytes, filename: str, mime_type: Optional[str]) -> str:
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            _extractor_pool, extract_text_from_bytes, data, filename, mime_type
+        )
+    except ValueError as e:
+        # Workers raise picklable ValueError; translate to the HTTP
+        # error here in the parent.
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Content-addressed LRU of extracted text, keyed by a hash of the file
+# bytes plus the extension and mime type that pick the handler. n8n
+# retries and users re-submitting the same document within a session
+# skip the entire parse. Entries above the per-entry text cutoff are
+# never cached — without it the worst case is 64 entries of up to
+# MAX_UPLOAD_BYTES of text each, i.e. gigabytes of resident strings.
+_EXTRACT_CACHE_MAX = 64
+_EXTRACT_CACHE_MAX_TEXT = 1_000_000
+_extract_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_extract_cache_lock = threading.Lock()
+
+
+async def _extract_cached(data: bytes, filename: str, mime_type: Optional[str]) -> str:
+    # The extension and mime type select the handler, so the same bytes
+    # resubmitted under a corrected filename must not hit the previous
+    # handler's result.
+    key = (
+        hashlib.blake2b(data, digest_size=16).hexdigest(),
+        filename.lower().rpartition(".")[2],
+        mime_type or "",
+    )
+    with _extract_cache_lock:
+        if key in _extract_cache:
+            _extract_cache.move_to_end(key)
+            return _extract_cache[key]
+
+    text = await _extract_in_pool(data, filename, mime_type)
+    # Empty text means extraction failed for these inputs; caching it
+    # would pin the failure for retries that could succeed.
+    if not text or len(text) > _EXTRACT_CACHE_MAX_TEXT:
+        return text
+
+    with _extract_cache_lock:
+        _extract_cache[key] = text
+        _extract_cache.move_to_end(key)
+        while len(_extract_cache) > _EXTRACT_CACHE_MAX:
+            _extract_cache.popitem(last=False)
+    return text
+
+
+# Suffix -> handler and mime-substring -> handler maps, built once at
+# import. Dispatch is a hash lookup instead of an endswith/in chain.
+_EXT_HANDLERS = {
+    "pdf": _extract_pdf,
+    "docx": _extract_docx,
+    "txt": _decode_txt,
+    "md": _decode_txt,
+}
+_MIME_HANDLERS = {
+    "pdf": _extract_pdf,
+    "word": _extract_docx,
+    "text": _decode_txt,
+}
+
+
 def extract_text_from_bytes(data: bytes, filename: str, mime_type: Optional[str]) -> str:
     """
     Decide how to extract text based on extension / mime type.
     """
-    fname_lower = filename.lower()
-
     try:
-        if fname_lower.endswith(".pdf") or (mime_type and "pdf" in mime_type):
-            return _extract_pdf(data)
+        handler = _EXT_HANDLERS.get(filename.lower().rpartition(".")[2])
+        if handler is None and mime_type:
+            for token, mime_handler in _MIME_HANDLERS.items():
+                if token in mime_type:
+                    handler = mime_handler
+                    break
+        if handler is None:
+            # Default catch-all
+            return _extract_generic(data, filename)
+        return handler(data)
+    except Exception as e:
+        print("[ERROR] Failed to extract text from file:", e)
+        traceback.print_exc()
+        # Plain ValueError on purpose: this runs inside process-pool
+        # workers, and HTTPException doesn't survive pickling back to
+        # the parent (it would kill the pool instead).
+        raise ValueError("Could not extract text from file.")
+
 
-        if fname_lower.endswith(".docx") or (mime_type and "word" in mime_type):
-            return _extract_docx(data)
+# ---------------------------------------------------------
+# WEB SEARCH (TAVILY)
+# ---------------------------------------------------------
+TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", "")
 
-        if fname_lower.endswith(".txt") or (mime_type and "text" in mime_type):
-            return data.decode("utf-8", errors="ignore").strip()
+# One pooled client for all outbound search calls — concurrent /search
+# requests share keep-alive connections instead of paying a TCP+TLS
+# handshake each, and the event loop is never blocked on Tavily I/O.
+_http = None
+if httpx:
+    _http = httpx.AsyncClient(
+        timeout=15,
+        limits=httpx.Limits(max_keepalive_connections=20),
+    )
+
+
+async def web_search_chunks(query: str, top_k: int = 5) -> list:
+    """
+    Supplement local retrieval with Tavily web search. Returns the same
+    chunk-dict shape as query_chunks; empty when httpx or the API key
+    is unavailable.
+    """
+    if not (_http and TAVILY_API_KEY):
+        return []
 
-        # Default catch-all
-        return _extract_generic(data, filename)
+    try:
+        resp = await _http.post(
+            "https://api.tavily.com/search",
+            json={"api_key": TAVILY_API_KEY, "query": query, "max_results": top_k},
+        )
+        resp.raise_for_status()
+        results = resp.json().get("results", [])
     except Exception as e:
-        print("[ERROR] Failed to extract text from file:", e)
-        traceback.print_exc()
-        raise HTTPException(status_code=400, detail="Could not extract text from file.")
+        print("[WARN] Web search failed:", e)
+        return []
+
+    return [
+        {
+            "text": r.get("content", ""),
+            "source": r.get("url"),
+            "user_id": None,
+            "domain": "web",
+            "distance": None,
+        }
+        for r in results
+        if r.get("content")
+    ]
+
+
+@app.on_event("shutdown")
+async def _close_http_client():
+    if _http:
+        await _http.aclose()
+
+
+@app.on_event("shutdown")
+def _shutdown_extractor_pool():
+    _extractor_pool.shutdown()
 
 
 # ---------------------------------------------------------
@@ -159,12 +465,38 @@ async def search_rag(data: SearchQuery):
     """
     try:
         print(f"[REQUEST] /search -> {data.query!r} | user_id={data.user_id} | domain={data.domain}")
-        chunks = query_chunks(
-            data.query,
-            top_k=5,
-            user_id=data.user_id,
-            domain=data.domain,
-        )
+        # Namespacing by user_id + domain keeps cached chunks from
+        # leaking across tenants.
+        namespace = (data.user_id, data.domain, 5)
+
+        # Kick the web search off first so it overlaps local retrieval;
+        # total latency becomes max(local, web) instead of the sum.
+        web_task = None
+        if data.use_web:
+            web_task = asyncio.create_task(web_search_chunks(data.query, top_k=5))
+
+        qvec = await run_in_threadpool(_normalized_query_vec, data.query)
+
+        chunks = await _query_cache.get(namespace, qvec)
+        if chunks is None:
+            # query_chunks hits Chroma synchronously; keep it off the
+            # event loop so concurrent searches don't serialize.
+            chunks = await run_in_threadpool(
+                query_chunks,
+                data.query,
+                top_k=5,
+                user_id=data.user_id,
+                domain=data.domain,
+                query_embedding=qvec.tolist(),
+            )
+            await _query_cache.put(namespace, qvec, chunks)
+
+        if web_task is not None:
+            if len(chunks) < max(2, 5 // 2):
+                # Local retrieval came up short — append the web results.
+                chunks = chunks + await web_task
+            else:
+                web_task.cancel()
 
         return {
             "query": data.query,
@@ -185,6 +517,54 @@ async def search_rag(data: SearchQuery):
 # ---------------------------------------------------------
 # PLAIN TEXT INGESTION ENDPOINT
 # ---------------------------------------------------------
+# n8n tends to fire one POST per document; a short batching window
+# coalesces those bursts into one embedding pass + one Chroma flush.
+_INGEST_BATCH_MAX = 32
+_INGEST_BATCH_WINDOW = 0.05  # seconds
+
+_ingest_queue: "asyncio.Queue" = asyncio.Queue()
+
+
+async def _ingest_batch_worker():
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _ingest_queue.get()]
+        deadline = loop.time() + _INGEST_BATCH_WINDOW
+        while len(batch) < _INGEST_BATCH_MAX:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_ingest_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        payloads = [(text, source, user, dom) for text, source, user, dom, _ in batch]
+        try:
+            counts = await run_in_threadpool(ingest_many, payloads)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+
+        for (*_, future), n in zip(batch, counts):
+            if not future.done():
+                future.set_result(n)
+
+
+@app.on_event("startup")
+async def _start_ingest_worker():
+    app.state.ingest_worker = asyncio.create_task(_ingest_batch_worker())
+
+
+@app.on_event("shutdown")
+async def _stop_ingest_worker():
+    worker = getattr(app.state, "ingest_worker", None)
+    if worker:
+        worker.cancel()
+
+
 @app.post("/ingest-text")
 async def ingest_text_endpoint(payload: IngestTextPayload):
     """
@@ -192,12 +572,17 @@ async def ingest_text_endpoint(payload: IngestTextPayload):
     Used for seed data or if n8n already has the text.
     """
     try:
-        n = ingest_text(
-            payload.text,
-            source_name=payload.source_name,
-            user_id=payload.user_id or "global",
-            domain=payload.domain or "general",
+        future = asyncio.get_running_loop().create_future()
+        await _ingest_queue.put(
+            (
+                payload.text,
+                payload.source_name,
+                payload.user_id,
+                payload.domain,
+                future,
+            )
         )
+        n = await future
         return {
             "status": "ok",
             "chunks_added": n,
@@ -219,27 +604,31 @@ async def ingest_file_endpoint(payload: IngestFilePayload):
     """
     Accepts a file as Base64 from n8n, extracts text server-side,
     chunks it and stores into Chroma with user_id + domain metadata.
+
+    Prefer /ingest-file-multipart: base64 inflates the payload by 33%
+    and burns server CPU decoding it.
     """
     try:
+        if len(payload.base64_data) > MAX_UPLOAD_BYTES * 4 // 3 + 8:
+            raise HTTPException(status_code=413, detail="File too large.")
+
         try:
-            file_bytes = base64.b64decode(payload.base64_data)
+            # Decoding a large upload is CPU work too — off the loop.
+            file_bytes = await run_in_threadpool(base64.b64decode, payload.base64_data)
         except binascii.Error:
             raise HTTPException(status_code=400, detail="Invalid Base64 data.")
 
-        text = extract_text_from_bytes(
-            data=file_bytes,
-            filename=payload.filename,
-            mime_type=payload.mime_type,
-        )
+        text = await _extract_cached(file_bytes, payload.filename, payload.mime_type)
 
         if not text:
             raise HTTPException(status_code=400, detail="No text could be extracted from file.")
 
-        n = ingest_text(
+        n = await run_in_threadpool(
+            ingest_text,
             text,
             source_name=payload.filename,
-            user_id=payload.user_id or "global",
-            domain=payload.domain or "general",
+            user_id=payload.user_id,
+            domain=payload.domain,
         )
 
         return {
@@ -258,6 +647,55 @@ async def ingest_file_endpoint(payload: IngestFilePayload):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ---------------------------------------------------------
+# MULTIPART FILE INGESTION ENDPOINT
+# ---------------------------------------------------------
+@app.post("/ingest-file-multipart")
+async def ingest_file_multipart_endpoint(
+    file: UploadFile = File(...),
+    user_id: str = Form("global"),
+    domain: str = Form("general"),
+):
+    """
+    Preferred upload path: multipart/form-data carries the raw file
+    bytes, so there is no 33% base64 inflation on the wire and no
+    decode copy on the server.
+    """
+    try:
+        file_bytes = await file.read()
+        if len(file_bytes) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="File too large.")
+        filename = file.filename or "upload"
+
+        text = await _extract_cached(file_bytes, filename, file.content_type)
+
+        if not text:
+            raise HTTPException(status_code=400, detail="No text could be extracted from file.")
+
+        n = await run_in_threadpool(
+            ingest_text,
+            text,
+            source_name=filename,
+            user_id=user_id or "global",
+            domain=domain or "general",
+        )
+
+        return {
+            "status": "ok",
+            "filename": filename,
+            "user_id": user_id,
+            "domain": domain,
+            "chunks_added": n,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print("[ERROR] /ingest-file-multipart failed:", e)
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ---------------------------------------------------------
 # ROOT HEALTHCHECK
 # ---------------------------------------------------------
@@ -268,4 +706,5 @@ async def home():
         "hint_search": "POST to /search with { 'query': 'your question', 'user_id': 'student_01', 'domain': 'general' }",
         "hint_ingest_text": "POST to /ingest-text with { 'text': '...', 'source_name': 'doc.txt', 'user_id': 'student_01' }",
         "hint_ingest_file": "POST to /ingest-file with { 'base64_data': '...', 'filename': 'doc.pdf', 'user_id': 'student_01' }",
+        "hint_ingest_file_multipart": "POST multipart/form-data to /ingest-file-multipart with fields 'file', 'user_id', 'domain' (preferred over base64)",
     }
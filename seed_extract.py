@@ -0,0 +1,194 @@
+# seed_extract.py
+#
+# Text extraction for seed documents. Kept in its own module so that
+# ProcessPoolExecutor workers can import the extractors without pulling
+# in chroma_setup (and therefore without constructing a second Chroma
+# client per worker process).
+
+import io
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+from typing import Callable, Dict, Tuple
+
+# Optional PDF + OCR libs — seed ingestion degrades to text-only when missing
+try:
+    from pypdf import PdfReader
+except Exception:
+    PdfReader = None
+
+try:
+    import pytesseract
+    from pdf2image import convert_from_path
+except Exception:
+    pytesseract = None
+    convert_from_path = None
+
+try:
+    from PIL import Image
+except Exception:
+    Image = None
+
+# Faster than pytesseract when present: one Tesseract API handle is
+# reused across images instead of one subprocess per call.
+try:
+    import tesserocr
+except Exception:
+    tesserocr = None
+
+
+# Feature flags, resolved once at import. Disabled formats are pruned
+# from the dispatch table below, so the per-file hot path never carries
+# branches for handlers that can't run anyway.
+CONFIG = {
+    "pdf": os.getenv("ENABLE_PDF", "1") != "0",
+    "docx": os.getenv("ENABLE_DOCX", "1") != "0",
+    "ocr": os.getenv("ENABLE_OCR", "1") != "0",
+}
+
+
+_OCR_ENABLED = CONFIG["ocr"] and bool(tesserocr or pytesseract)
+
+# Tesseract throughput is linear in pixels; scans above this edge length
+# are downscaled before OCR.
+_OCR_MAX_DIM = 2000
+
+
+def _prep_for_ocr(img):
+    img = img.convert("L")
+    if max(img.size) > _OCR_MAX_DIM:
+        img.thumbnail((_OCR_MAX_DIM, _OCR_MAX_DIM))
+    return img
+
+
+def _ocr_images(images) -> list:
+    """
+    OCR a sequence of PIL images, preferring one shared tesserocr API
+    handle over a pytesseract subprocess per image.
+    """
+    parts = []
+    if tesserocr:
+        with tesserocr.PyTessBaseAPI() as api:
+            for img in images:
+                api.SetImage(_prep_for_ocr(img))
+                parts.append(api.GetUTF8Text())
+    elif pytesseract:
+        for img in images:
+            parts.append(pytesseract.image_to_string(_prep_for_ocr(img)))
+    return parts
+
+
+def _read_plain_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+def _ocr_pdf(path: str) -> str:
+    """
+    Rasterize a PDF and OCR every page. Only used when the PDF has no
+    text layer.
+    """
+    if not _OCR_ENABLED or not convert_from_path:
+        print(f"[WARN] OCR unavailable, cannot OCR: {path}")
+        return ""
+
+    # Rasterize to disk and stream pages through OCR one at a time —
+    # holding every page of a long PDF as a PIL image is O(pages) RAM.
+    with tempfile.TemporaryDirectory() as tmp:
+        page_paths = convert_from_path(path, output_folder=tmp, paths_only=True)
+
+        def pages():
+            for page_path in page_paths:
+                with Image.open(page_path) as img:
+                    yield img
+
+        return "\n\n".join(_ocr_images(pages()))
+
+
+# A text-native PDF yields far more than this per page; below it the
+# text layer is assumed missing or broken and OCR takes over.
+_MIN_CHARS_PER_PAGE = 50
+
+
+def _read_pdf(path: str) -> str:
+    if not PdfReader:
+        print(f"[WARN] pypdf not installed, skipping PDF: {path}")
+        return ""
+    reader = PdfReader(path)
+    page_texts = [(page.extract_text() or "") for page in reader.pages]
+    text = "\n\n".join(page_texts)
+
+    # Only pay for rasterization + Tesseract on scanned PDFs; on a
+    # text-native PDF the OCR pass is pure waste.
+    per_page = sum(len(p) for p in page_texts) / max(1, len(page_texts))
+    if per_page < _MIN_CHARS_PER_PAGE:
+        ocr_text = _ocr_pdf(path)
+        if ocr_text.strip():
+            text = ocr_text
+    return text
+
+
+_DOCX_T = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t"
+
+
+def _read_docx(path: str) -> str:
+    """
+    Read a .docx with a single unzip: body text streamed out of
+    word/document.xml via iterparse, and embedded images OCR'd straight
+    from the archive when the document has no text layer. No tmp files,
+    no second parse of the zip.
+    """
+    parts = []
+    with zipfile.ZipFile(path) as z:
+        with z.open("word/document.xml") as doc_xml:
+            for _, elem in ET.iterparse(doc_xml):
+                if elem.tag == _DOCX_T and elem.text:
+                    parts.append(elem.text)
+                elem.clear()
+        text = "\n".join(parts)
+
+        if not text.strip() and _OCR_ENABLED and Image:
+            # Image-only document — OCR the embedded media instead
+            images = []
+            for name in z.namelist():
+                if not name.startswith("word/media/"):
+                    continue
+                try:
+                    images.append(Image.open(io.BytesIO(z.read(name))))
+                except Exception:
+                    continue
+            text = "\n\n".join(p for p in _ocr_images(images) if p.strip())
+
+    return text
+
+
+# One hash lookup decides how a seed file is read; adding a format is a
+# one-line entry here. The table is specialized for the active CONFIG at
+# import — a disabled or unimportable format simply isn't in it.
+_EXT_DISPATCH: Dict[str, Callable[[str], str]] = {
+    ".txt": _read_plain_text,
+    ".md": _read_plain_text,
+}
+if CONFIG["pdf"] and PdfReader is not None:
+    _EXT_DISPATCH[".pdf"] = _read_pdf
+if CONFIG["docx"]:
+    _EXT_DISPATCH[".docx"] = _read_docx
+
+SUPPORTED_EXTENSIONS = tuple(_EXT_DISPATCH)
+
+
+def _extract_one(path: str) -> Tuple[str, str]:
+    """
+    Extract text from one seed file. Top-level and picklable so it can
+    run inside a ProcessPoolExecutor worker.
+    """
+    file = os.path.basename(path)
+    reader = _EXT_DISPATCH.get(os.path.splitext(file)[1].lower())
+    if reader is None:
+        return file, ""
+    try:
+        return file, reader(path)
+    except Exception as e:
+        print(f"[WARN] Could not read {path}: {e}")
+        return file, ""